@@ -5,18 +5,20 @@ Flask API for Receiving JSON Table Data
 
 This Flask API serves as an endpoint for receiving JSON data containing tables
 and validates both the external and internal structures of the input data.
-It uses JSON schemas to validate the internal structure of each table type
+It uses JSON schemas, turned into specialized Python functions at import, to
+validate the internal structure of each table type
 ("hired_employees", "departments", "jobs"). The validated data is then
-converted to a Pandas DataFrame and returned as a JSON response.
+converted to an Arrow record batch and merged into the Snowflake table.
 
 Endpoints:
 - POST /api/receive_table_data: Receives JSON data, validates its structure,
-  converts it to a DataFrame, and returns the DataFrame as a JSON response.
+  converts it to an Arrow record batch, and merges it into the Snowflake table.
 
 Dependencies:
 - Flask: Web framework for building the API.
-- pandas: Data manipulation library for working with DataFrames.
-- jsonschema: Library for validating JSON data against a specified schema.
+- orjson: Fast JSON library used to parse requests and serialize responses.
+- waitress: Production WSGI server used to serve the API.
+- pyarrow: Columnar memory format used to build the records and write them as Parquet.
 
 Note: Ensure that the required dependencies are installed before running the API.
 
@@ -44,25 +46,72 @@ Example Response:
 }
 """
 
+import io
+import logging
+import queue
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask, request, jsonify
-import pandas as pd
-from jsonschema import validate, ValidationError, SchemaError
+from flask.json.provider import JSONProvider
+from werkzeug.exceptions import RequestEntityTooLarge
+from waitress import serve
+import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
 from dotenv import dotenv_values
 import snowflake.connector
-from snowflake.connector.pandas_tools import write_pandas
+
+logger = logging.getLogger(__name__)
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    JSON provider that parses requests and serializes responses of the Flask app with orjson.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Build the response body from the orjson bytes, without decoding them to str and encoding them back
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype="application/json")
+
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+# Reject request bodies larger than 1 MB before reading them
+# (a table of 1000 records is far below this limit)
+app.config["MAX_CONTENT_LENGTH"] = 1_048_576
+
+# JSON body of the error responses, the message is serialized into it
+error_response_template = b'{"status":"error","message":%b}'
+
+# Load the Snowflake credentials once from the .env file
+snowflake_credentials = dotenv_values(".env")
+
+# Pool of open Snowflake connections reused across requests
+snowflake_connection_pool = queue.LifoQueue(maxsize=8)
+
+# Threads running the Snowflake I/O of the requests, one per pooled connection
+snowflake_executor = ThreadPoolExecutor(max_workers=snowflake_connection_pool.maxsize)
+
+# The per-table lookup tables below are read-only mappings, built once at import and shared by all requests
 
 # JSON schemas for each table "hired_employees", "departments" and "jobs"
-table_json_schemas = {
+# (each column must have between 1 and 1000 records)
+table_json_schemas = MappingProxyType({
     "hired_employees": {
         "type": "object",
         "properties": {
-            "id": {"type": "array", "items": {"type": "integer"}},
-            "name": {"type": "array", "items": {"type": ["string", "null"] }},
-            "datetime": {"type": "array", "items": {"type": ["string", "null"], "format": "date-time"}},
-            "department_id": {"type": "array", "items": {"type": ["integer", "null"]}},
-            "job_id": {"type": "array", "items": {"type": ["integer", "null"]}},
+            "id": {"type": "array", "minItems": 1, "maxItems": 1000, "items": {"type": "integer"}},
+            "name": {"type": "array", "minItems": 1, "maxItems": 1000, "items": {"type": ["string", "null"] }},
+            "datetime": {"type": "array", "minItems": 1, "maxItems": 1000, "items": {"type": ["string", "null"], "format": "date-time"}},
+            "department_id": {"type": "array", "minItems": 1, "maxItems": 1000, "items": {"type": ["integer", "null"]}},
+            "job_id": {"type": "array", "minItems": 1, "maxItems": 1000, "items": {"type": ["integer", "null"]}},
         },
         "required": ["id", "name", "datetime", "department_id", "job_id"],
         "additionalProperties": False
@@ -70,8 +119,8 @@ table_json_schemas = {
     "departments": {
         "type": "object",
         "properties": {
-            "id": {"type": "array", "items": {"type": "integer"}},
-            "department": {"type": "array", "items": {"type": "string"}},
+            "id": {"type": "array", "minItems": 1, "maxItems": 1000, "items": {"type": "integer"}},
+            "department": {"type": "array", "minItems": 1, "maxItems": 1000, "items": {"type": "string"}},
         },
         "required": ["id", "department"],
         "additionalProperties": False
@@ -79,15 +128,113 @@ table_json_schemas = {
     "jobs": {
         "type": "object",
         "properties": {
-            "id": {"type": "array", "items": {"type": "integer"}},
-            "job": {"type": "array", "items": {"type": "string"}},
+            "id": {"type": "array", "minItems": 1, "maxItems": 1000, "items": {"type": "integer"}},
+            "job": {"type": "array", "minItems": 1, "maxItems": 1000, "items": {"type": "string"}},
         },
         "required": ["id", "job"],
         "additionalProperties": False
     }
+})
+
+# Arrow data types of the columns of each table "hired_employees", "departments" and "jobs"
+table_arrow_types = MappingProxyType({
+    "hired_employees": {
+        "id": pa.int64(),
+        "name": pa.string(),
+        "datetime": pa.string(),
+        "department_id": pa.int64(),
+        "job_id": pa.int64(),
+    },
+    "departments": {
+        "id": pa.int64(),
+        "department": pa.string(),
+    },
+    "jobs": {
+        "id": pa.int64(),
+        "job": pa.string(),
+    }
+})
+
+# Uppercase Snowflake names of each table and of its columns
+snowflake_table_names = MappingProxyType({table_name: table_name.upper() for table_name in table_json_schemas})
+snowflake_column_names = MappingProxyType({
+    table_name: {column_name: column_name.upper() for column_name in table_json_schema["properties"]}
+    for table_name, table_json_schema in table_json_schemas.items()
+})
+
+# Python expressions checking the JSON type of a record "x"
+# (integers may also be floats without a fractional part, as in JSON Schema,
+# and must fit in the int64 columns of the Arrow record batch)
+json_type_checks = {
+    "integer": ("(type(x) is int or type(x) is float and x.is_integer())"
+                " and -9223372036854775808 <= x < 9223372036854775808"),
+    "string": "type(x) is str",
+    "null": "x is None",
 }
 
 
+def generate_table_validator(table_name, table_json_schema):
+    """
+    Generate a validation function specialized for the JSON schema of a table.
+    The column names, record count bounds and data types are written into the code of the function,
+    so no schema is walked when a request is validated. Formats such as "date-time" are not enforced.
+
+    Parameters:
+    - table_name (str): Name of table.
+    - table_json_schema (dict): JSON schema of the table, with an array property for each column.
+
+    Returns:
+    - function: A function that takes the table data and returns an error message, or None if it is valid.
+    """
+    column_names = list(table_json_schema["properties"])
+    if set(table_json_schema["required"]) != set(column_names) or table_json_schema["additionalProperties"]:
+        raise ValueError(f"Invalid JSON schema for table '{table_name}'. All the columns must be required.")
+
+    invalid_table_message = f"Verify the columns and data types of the table '{table_name}'."
+    source_lines = [
+        "def validate(table_data):",
+        "    if type(table_data) is not dict or table_data.keys() != required_column_names:",
+        f"        return {invalid_table_message!r}",
+    ]
+    for column_name in column_names:
+        column_schema = table_json_schema["properties"][column_name]
+        min_items, max_items = column_schema["minItems"], column_schema["maxItems"]
+        item_types = column_schema["items"]["type"]
+        item_types = [item_types] if isinstance(item_types, str) else item_types
+        item_check = " or ".join(json_type_checks[item_type] for item_type in item_types)
+        source_lines += [
+            f"    records = table_data[{column_name!r}]",
+            "    if type(records) is not list:",
+            f"        return {invalid_table_message!r}",
+            f"    if not {min_items} <= len(records) <= {max_items}:",
+            f"        return (\"Invalid number of records for column '{column_name}'. \"",
+            f"                \"Expected between {min_items} and {max_items} records, but got \" + str(len(records)) + \".\")",
+            "    for x in records:",
+            f"        if not ({item_check}):",
+            f"            return {invalid_table_message!r}",
+        ]
+    source_lines.append("    return None")
+
+    # The required column names are compared as one frozenset, built here instead of on every call
+    namespace = {"required_column_names": frozenset(column_names)}
+    exec(compile("\n".join(source_lines), f"<{table_name} validator>", "exec"), namespace)
+    return namespace["validate"]
+
+
+# Valid keys of the JSON data ("table") and of its entry data (the table names)
+# and their quoted text for the error messages
+valid_entry_keys = ("table",)
+valid_entry_keys_text = ", ".join(f"'{key}'" for key in valid_entry_keys)
+valid_table_names = tuple(table_json_schemas)
+valid_table_names_text = ", ".join(f"'{key}'" for key in valid_table_names)
+
+# Validators for each table, generated once at import instead of per request
+table_json_validators = MappingProxyType({
+    schema_table_name: generate_table_validator(schema_table_name, table_json_schema)
+    for schema_table_name, table_json_schema in table_json_schemas.items()
+})
+
+
 def create_snowflake_connection(snowflake_credentials):
     """
     Connects to Snowflake using the provided credentials from the .env file.
@@ -105,78 +252,173 @@ def create_snowflake_connection(snowflake_credentials):
             account=snowflake_credentials["account"],
             warehouse=snowflake_credentials["warehouse"],
             database=snowflake_credentials["database"],
-            schema=snowflake_credentials["schema"]
+            schema=snowflake_credentials["schema"],
+            # Keep the session alive with a heartbeat while the connection waits in the pool
+            client_session_keep_alive=True
         )
         return snowflake_connection
     except snowflake.connector.errors.DatabaseError as snowflake_error:
-        print(f"Error connecting to Snowflake: {str(snowflake_error)}")
+        logger.error("Error connecting to Snowflake: %s", snowflake_error)
+
+
+def acquire_snowflake_connection():
+    """
+    Get an open Snowflake connection from the pool, or create a new one if the pool is empty.
+
+    Returns:
+    - snowflake.connector.connection.SnowflakeConnection: A Snowflake connection object.
+    """
+    while True:
+        try:
+            conn = snowflake_connection_pool.get_nowait()
+        except queue.Empty:
+            return create_snowflake_connection(snowflake_credentials)
+        # Skip connections closed while they were in the pool
+        if not conn.is_closed():
+            return conn
+
+
+def release_snowflake_connection(conn, reusable=True):
+    """
+    Return a Snowflake connection to the pool, or close it if it can not be reused.
+
+    Parameters:
+    - conn (snowflake.connector.connection): Snowflake connection object.
+    - reusable (bool): False if the connection failed and must not be reused.
+
+    Returns:
+    - None
+    """
+    if conn is None:
+        return
+    if reusable and not conn.is_closed():
+        try:
+            snowflake_connection_pool.put_nowait(conn)
+            return
+        except queue.Full:
+            pass
+    conn.close()
+
 
+def release_snowflake_connection_future(conn_future):
+    """
+    Return the Snowflake connection of a finished acquire_snowflake_connection future to the pool.
+
+    Parameters:
+    - conn_future (concurrent.futures.Future): Future of acquire_snowflake_connection.
 
-def delete_records_by_id_for_snowflake(conn, table_name, id_values):
+    Returns:
+    - None
     """
-    Delete records from Snowflake table based on the specified IDs.
+    if conn_future.exception() is None:
+        release_snowflake_connection(conn_future.result())
+
+
+def merge_records_by_id_for_snowflake(conn, record_batch, table_name):
+    """
+    Insert or update records of a Snowflake table by ID using a single MERGE statement.
+    The records are first loaded into a temporary table with the same columns as the table.
 
     Parameters:
     - conn (snowflake.connector.connection): Snowflake connection object.
+    - record_batch (pyarrow.RecordBatch): Arrow record batch with the records, the column names must be uppercase.
     - table_name (str): The name of the Snowflake table.
-    - id_values (list): List of IDs to be deleted.
 
     Returns:
     - None
     """
+    staging_table_name = f"TMP_{table_name}"
+    column_names = record_batch.schema.names
+    # Construct the MERGE query matching the records by ID
+    update_columns = ", ".join(f"target.{column_name} = source.{column_name}"
+                               for column_name in column_names if column_name != "ID")
+    insert_columns = ", ".join(column_names)
+    insert_values = ", ".join(f"source.{column_name}" for column_name in column_names)
+    merge_query = (f"MERGE INTO {table_name} AS target USING {staging_table_name} AS source "
+                   f"ON target.ID = source.ID "
+                   f"WHEN MATCHED THEN UPDATE SET {update_columns} "
+                   f"WHEN NOT MATCHED THEN INSERT ({insert_columns}) VALUES ({insert_values})")
+    # Write the records as a single snappy-compressed Parquet file in memory
+    parquet_file = io.BytesIO()
+    pq.write_table(pa.Table.from_batches([record_batch]), parquet_file, compression="snappy")
+    parquet_file.seek(0)
     # Create a cursor object
     cursor = conn.cursor()
     try:
-        # Generate a comma-separated string of IDs for the WHERE clause
-        id_string = ', '.join(map(str, id_values))
-        # Construct the DELETE query
-        delete_query = f"DELETE FROM {table_name} WHERE ID IN ({id_string})"
-        # Execute the DELETE query
-        cursor.execute(delete_query)
+        # Create an empty temporary table for this session with the columns of the table
+        cursor.execute(f"CREATE OR REPLACE TEMPORARY TABLE {staging_table_name} LIKE {table_name}")
+        # Upload the Parquet file to the stage of the temporary table
+        cursor.execute(f"PUT file://{staging_table_name}.parquet @%{staging_table_name} AUTO_COMPRESS=FALSE",
+                       file_stream=parquet_file)
+        # Load the records into the temporary table and remove the file from the stage
+        cursor.execute(f"COPY INTO {staging_table_name} FROM @%{staging_table_name} "
+                       "FILE_FORMAT=(TYPE=PARQUET) MATCH_BY_COLUMN_NAME=CASE_SENSITIVE PURGE=TRUE")
+        # Execute the MERGE query
+        cursor.execute(merge_query)
         # Commit the changes
         conn.commit()
-        # print(f"Records with IDs {id_string} deleted successfully.")
-    except Exception as e:
-        # Handle the exception (you can modify this part based on your requirements)
-        print(f"Error deleting records with IDs {id_string}. {str(e)}")
     finally:
         # Close the cursor
         cursor.close()
 
 
-def validate_dictionary_with_unique_key(data, key_list):
+def write_records_to_snowflake(conn, record_batch, table_name):
     """
-    Validate if data is a dictionary with only one key and the value is not empty.
+    Insert or update the records of an Arrow record batch into a Snowflake table, then release the connection.
 
     Parameters:
-    - data (dict): Dictionary data.
-    - key_list (array): List of keys.
+    - conn (snowflake.connector.connection): Snowflake connection object acquired from the pool.
+    - record_batch (pyarrow.RecordBatch): Arrow record batch with the records, the column names must be uppercase.
+    - table_name (str): The name of the Snowflake table.
 
     Returns:
-    - tuple: A tuple containing a boolean indicating validation result and an error message (if any).
+    - None
     """
     try:
-        # Check if the data is a dictionary
-        if not isinstance(data, dict):
-            raise ValidationError("Invalid input. Must be a dictionary.")
+        # Insert new records and update existing records with the same IDs
+        merge_records_by_id_for_snowflake(conn, record_batch, table_name)
+    except Exception:
+        # Discard the connection, a new one will be created on the next request
+        release_snowflake_connection(conn, reusable=False)
+        raise
+    # Return the connection to the pool
+    release_snowflake_connection(conn)
 
-        # Check if there is exactly one key in the dictionary
-        if len(data) != 1:
-            raise ValidationError("The dictionary must have exactly one key.")
 
-        # Check if the specified key is present in the dictionary
-        dict_key = next(iter(data))
-        if dict_key not in key_list:
-            valid_keys = ', '.join(map(lambda key: f"'{key}'", key_list))
-            raise ValidationError(f"The dictionary key '{dict_key}' should be: {valid_keys}")
+def validate_dictionary_with_unique_key(data, valid_keys, valid_keys_text):
+    """
+    Validate if data is a dictionary with only one key and the value is not empty,
+    and extract that key and its value in the same pass.
 
-        # Check if the value corresponding to the specified key is a non-empty dictionary
-        if not data[dict_key] or not isinstance(data[dict_key], dict):
-            raise ValidationError(f"The dictionary associated with key '{dict_key}' must not be empty and should be a valid dictionary.")
+    Parameters:
+    - data (dict): Dictionary data.
+    - valid_keys (tuple): Tuple of valid keys.
+    - valid_keys_text (str): Quoted valid keys for the error message.
+
+    Returns:
+    - tuple: A tuple containing a boolean indicating validation result, an error message (if any),
+      and the key and its value (None if validation failed).
+    """
+    # Check if the data is a dictionary (parsed JSON objects are always plain dictionaries)
+    if type(data) is not dict:
+        return False, "Invalid input. Must be a dictionary.", None, None
+
+    # Check if there is exactly one key in the dictionary
+    if len(data) != 1:
+        return False, "The dictionary must have exactly one key.", None, None
 
-        return True, ""  # Validation successful
-    except ValidationError as validation_error:
-        return False, str(validation_error)  # Validation failed with an error message
+    # Extract the only key and its value
+    dict_key, dict_value = next(iter(data.items()))
+
+    # Check if the specified key is present in the dictionary
+    if dict_key not in valid_keys:
+        return False, f"The dictionary key '{dict_key}' should be: {valid_keys_text}", None, None
+
+    # Check if the value corresponding to the specified key is a non-empty dictionary
+    if not dict_value or type(dict_value) is not dict:
+        return False, f"The dictionary associated with key '{dict_key}' must not be empty and should be a valid dictionary.", None, None
+
+    return True, "", dict_key, dict_value  # Validation successful
 
 
 def validate_table_data(table_data, table_name):
@@ -190,26 +432,18 @@ def validate_table_data(table_data, table_name):
     Returns:
     - tuple: A tuple containing a boolean indicating validation result and an error message (if any).
     """
-    try:
-        # Validate the schema of table data
-        try:
-            # Validate the schema using jsonschema
-            validate(instance=table_data, schema=table_json_schemas[table_name])
-            return True, ""  # Validation successful
-        except ValidationError as validation_error:
-            # If validation using jsonschema fails, provide a custom error message
-            raise ValidationError(f"Verify the columns and data types of the table '{table_name}'.") from validation_error
-        except SchemaError as schema_error:
-            # If there is an issue with the JSON schema itself, provide a custom error message
-            raise ValidationError(f"Invalid JSON schema for table '{table_name}'.") from schema_error
+    # Validate the schema using the generated validator of the table
+    error_message = table_json_validators[table_name](table_data)
+    if error_message is not None:
+        return False, error_message
 
-    except ValidationError as validation_error:
-        return False, str(validation_error)  # Validation failed with an error message
+    return True, ""  # Validation successful
 
 
 def validate_record_count(table_data):
     """
-    Validate the number of records of table data.
+    Validate that all the columns of table data have the same number of records.
+    The bounds of the number of records are checked by the table JSON schemas.
 
     Parameters:
     - table_data (dict): Data inside of "hired_employees", "departments", "jobs"
@@ -217,112 +451,140 @@ def validate_record_count(table_data):
     Returns:
     - tuple: A tuple containing a boolean indicating validation result and an error message (if any).
     """
-    try:
-        expected_record_count = None
+    # Count the records of every column once
+    record_counts = list(map(len, table_data.values()))
 
-        for column_name, records in table_data.items():
-            record_count = len(records)
-            if not 1 <= record_count <= 1000:
-                raise ValidationError(f"Invalid number of records for column '{column_name}'. "
-                                      f"Expected between 1 and 1000 records, but got {record_count}.")
+    expected_record_count = record_counts[0]
+    if record_counts.count(expected_record_count) != len(record_counts):
+        # Find the first column that does not have the same number of records as the first column
+        column_name, record_count = next((column_name, len(records))
+                                         for column_name, records in table_data.items()
+                                         if len(records) != expected_record_count)
+        return False, (f"Mismatched record count for column '{column_name}'. "
+                       f"Expected {expected_record_count} records, but got {record_count}.")
 
-            if expected_record_count is None:
-                # Set the expected record count for the first column
-                expected_record_count = record_count
-            elif record_count != expected_record_count:
-                # Check if the current column has the same number of records as the first column
-                raise ValidationError(f"Mismatched record count for column '{column_name}'. "
-                                      f"Expected {expected_record_count} records, but got {record_count}.")
+    return True, ""  # Validation successful
 
-        return True, ""  # Validation successful
-    except ValidationError as validation_error:
-        return False, str(validation_error)  # Validation failed with an error message
+
+def validate_unique_ids(table_data):
+    """
+    Validate that the IDs of table data are unique, so each record is merged by ID at most once.
+
+    Parameters:
+    - table_data (dict): Data inside of "hired_employees", "departments", "jobs"
+
+    Returns:
+    - tuple: A tuple containing a boolean indicating validation result and an error message (if any).
+    """
+    # Use the IDs of the table data directly
+    id_values = table_data["id"]
+    if len(set(id_values)) != len(id_values):
+        # Find the first repeated ID
+        seen_ids = set()
+        for id_value in id_values:
+            if id_value in seen_ids:
+                return False, f"Duplicate ID {id_value} for column 'id'. Expected unique IDs."
+            seen_ids.add(id_value)
+
+    return True, ""  # Validation successful
+
+
+def error_response(message, status_code):
+    """
+    Build an error response from a pre-built JSON template, without building a dictionary to serialize.
+
+    Parameters:
+    - message (str): Error message.
+    - status_code (int): HTTP status code of the response.
+
+    Returns:
+    - flask.Response: The JSON error response.
+    """
+    return app.response_class(error_response_template % orjson.dumps(message), status=status_code,
+                              mimetype="application/json")
 
 
 @app.route("/api/receive-table-data", methods=["POST"])
 def receive_table_data():
     """
-    API endpoint to receive JSON data containing a table and return it as a DataFrame.
+    API endpoint to receive JSON data containing a table and merge it into the Snowflake table.
 
     Returns:
-    - JSON: The DataFrame as a JSON response.
+    - JSON: A JSON response with the status and a message.
     """
     try:
-        # Get the JSON data from the request
-        json_data = request.get_json()
+        # Get the JSON data from the request, without keeping a cached copy of the body
+        try:
+            json_data = request.get_json(cache=False)
+        except RequestEntityTooLarge:
+            return error_response(f"The request body must not exceed {app.config['MAX_CONTENT_LENGTH']} bytes.", 413)
 
-        # Validate JSON data
-        entry_key_list = ["table"]
-        is_valid_entry_dict, entry_dict_error_message = validate_dictionary_with_unique_key(json_data, entry_key_list)
+        # Validate JSON data and extract the entry data
+        is_valid_entry_dict, entry_dict_error_message, _, entry_data = \
+            validate_dictionary_with_unique_key(json_data, valid_entry_keys, valid_entry_keys_text)
         if not is_valid_entry_dict:
-            response = {"status": "error", "message": entry_dict_error_message}
-            return jsonify(response), 400
-
-        # Extract the entry key and entry data
-        entry_key = next(iter(json_data))
-        entry_data = json_data[entry_key]
+            return error_response(entry_dict_error_message, 400)
 
-        # Validate the entry data
-        table_name_list = ["hired_employees", "departments", "jobs"]
-        is_valid_table_dict, table_dict_error_message = validate_dictionary_with_unique_key(entry_data, table_name_list)
+        # Validate the entry data and extract the table name and table data
+        is_valid_table_dict, table_dict_error_message, table_name, table_data = \
+            validate_dictionary_with_unique_key(entry_data, valid_table_names, valid_table_names_text)
         if not is_valid_table_dict:
-            response = {"status": "error", "message": table_dict_error_message}
-            return jsonify(response), 400
-
-        # Extract the table name and table data
-        table_name = next(iter(entry_data))
-        table_data = entry_data[table_name]
+            return error_response(table_dict_error_message, 400)
 
         # Validate the schema (column names and the data types) of the table data
         is_valid_table_data, table_data_error_message = validate_table_data(table_data, table_name)
         if not is_valid_table_data:
-            response = {"status": "error", "message": table_data_error_message}
-            return jsonify(response), 400
+            return error_response(table_data_error_message, 400)
 
         # Validate record count of table data
         is_valid_record_count, record_count_error_message = validate_record_count(table_data)
         if not is_valid_record_count:
-            response = {"status": "error", "message": record_count_error_message}
-            return jsonify(response), 400
+            return error_response(record_count_error_message, 400)
 
-        # Convert the data dictionary to a DataFrame
+        # Validate unique IDs of table data
+        is_valid_unique_ids, unique_ids_error_message = validate_unique_ids(table_data)
+        if not is_valid_unique_ids:
+            return error_response(unique_ids_error_message, 400)
+
+        # Get a Snowflake connection in the Snowflake I/O threads while the record batch is built,
+        # so a new connection handshake overlaps with the record batch construction
+        conn_future = snowflake_executor.submit(acquire_snowflake_connection)
+
+        # Convert the data dictionary to an Arrow record batch
         try:
-            df = pd.DataFrame(table_data)
-            # print(df)
-        except Exception as exception:
-            response = {"status": "error", "message": f"Error creating Pandas DataFrame: {str(exception)}"}
-            return jsonify(response), 500
+            # Build each column with the data type and the uppercase name of the table column
+            column_types = table_arrow_types[table_name]
+            column_names = snowflake_column_names[table_name]
+            record_batch = pa.record_batch(
+                [pa.array(records, type=column_types[column_name]) for column_name, records in table_data.items()],
+                names=[column_names[column_name] for column_name in table_data]
+            )
+        except Exception:
+            logger.exception("Error creating Arrow record batch")
+            # Return the unused Snowflake connection to the pool once it has been acquired
+            conn_future.add_done_callback(release_snowflake_connection_future)
+            return error_response("Error creating Arrow record batch.", 500)
 
         # Uppercase table name
-        table_name = table_name.upper()
-        
-        # Uppercase all column names
-        df.columns = [col.upper() for col in df.columns]
-        
-        # Extract unique IDs from the DataFrame
-        unique_ids = df['ID'].unique().tolist()
-
-        # Load JSON data from the .env file
-        snowflake_credentials = dotenv_values(".env")
-        
-        # Snowflake connection
-        conn = create_snowflake_connection(snowflake_credentials)
+        table_name = snowflake_table_names[table_name]
+
         try:
-            # Delete existing records with the same IDs
-            delete_records_by_id_for_snowflake(conn, table_name, unique_ids)
-            # Write new data to Snowflake
-            success, nchunks, nrows, _ = write_pandas(conn, df, table_name)
+            # Write the records to Snowflake in the Snowflake I/O threads
+            conn = conn_future.result()
+            snowflake_executor.submit(write_records_to_snowflake, conn, record_batch, table_name).result()
             # Success response
             response = {"status": "success", "message": f"Data was inserted into table '{table_name}'."}
             return jsonify(response), 200
         except Exception as _:
-            response = {"status": "error", "message": f"Error inserting data into  table '{table_name}'."}
-            return jsonify(response), 500
+            return error_response(f"Error inserting data into  table '{table_name}'.", 500)
 
     except Exception as exception:
-        response = {"status": "error", "message": str(exception)}
-        return jsonify(response), 500
+        return error_response(str(exception), 500)
 
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    # Log only warnings and errors
+    logging.basicConfig(level=logging.WARNING)
+    # Serve the app with the Waitress production WSGI server, so requests waiting on Snowflake
+    # are handled concurrently in threads instead of one at a time by the Flask development server
+    serve(app, host="127.0.0.1", port=5000, threads=8)
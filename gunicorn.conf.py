@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+
+"""
+Gunicorn Configuration for Serving the API on Linux
+
+Gunicorn runs several worker processes, each handling requests in threads.
+The app is imported once in the master process before the workers are forked,
+so the table validators generated at import are shared by all the workers.
+
+Usage:
+gunicorn api:app
+(this file is loaded by default when Gunicorn is started from the repository folder)
+"""
+
+import multiprocessing
+
+bind = "127.0.0.1:5000"
+workers = multiprocessing.cpu_count() * 2 + 1
+worker_class = "gthread"
+threads = 4
+preload_app = True
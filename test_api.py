@@ -4,25 +4,32 @@
 Unit tests for the Flask API in the 'api' module, focusing on the '/api/receive-table-data' endpoint.
 Scenarios cover positive cases with valid data for tables like 'hired_employees,' 'departments,' and 'jobs.'
 Error handling is tested for empty dictionaries, invalid keys, non-dictionary inputs, tables with missing
-columns, invalid columns, extra columns, mismatched record counts, empty records, and data type inconsistencies.
+columns, invalid columns, extra columns, mismatched record counts, duplicate IDs, empty records, and data type inconsistencies
+(booleans or out-of-range values in integer columns, non-list columns and nulls in non-nullable columns).
 Additional tests involve large datasets, checking successful processing with 1000 records and proper error
-handling with 1001 records. The goal is to ensure the API's robustness and correctness when handling diverse table data.
+handling with 1001 records and with request bodies over 1 MB. Writes to Snowflake are tested with a mock
+connection, checking the executed statements and that connections are pooled or closed. The goal is to ensure the API's robustness and correctness when handling diverse table data.
 """
 
 import unittest
 import json
+import queue
+from unittest import mock
+import api
 from api import app
 
 
 def generate_large_data(n=100):
+    # The same list of IDs is reused for every integer column, the data is only serialized
+    ids = list(range(1, n + 1))
     large_data = {
         "table": {
             "hired_employees": {
-                "id": list(range(1, n + 1)),
-                "name": ["Name" + str(i) for i in range(1, n + 1)],
+                "id": ids,
+                "name": list(map("Name{}".format, ids)),
                 "datetime": ["2023-01-01"] * n,
-                "department_id": list(range(1, n + 1)),
-                "job_id": list(range(1, n + 1))
+                "department_id": ids,
+                "job_id": ids
             }
         }
     }
@@ -204,6 +211,23 @@ class TestFlaskAPI(unittest.TestCase):
         self.assertEqual(result['status'], 'error')
         self.assertIn("Mismatched record count for column", result['message'])
 
+    def test_receive_table_data_with_duplicate_ids(self):
+        data = {
+            "table": {
+                "jobs": {
+                    "id": [101, 102, 101],
+                    "job": ["Manager", "Developer", "Analyst"]
+                }
+            }
+        }
+
+        response = self.app.post('/api/receive-table-data', data=json.dumps(data), content_type='application/json')
+        result = json.loads(response.data.decode('utf-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(result['status'], 'error')
+        self.assertIn("Duplicate ID 101 for column 'id'. Expected unique IDs.", result['message'])
+
     def test_receive_table_data_with_empty_records(self):
         data = {
             "table": {
@@ -244,6 +268,91 @@ class TestFlaskAPI(unittest.TestCase):
         self.assertEqual(result['status'], 'error')
         self.assertIn("Invalid number of records for column 'id'. Expected between 1 and 1000 records, but got 1001.", result['message'])
 
+    def test_receive_table_data_with_boolean_in_integer_column(self):
+        data = {
+            "table": {
+                "jobs": {
+                    "id": [101, True],
+                    "job": ["Manager", "Developer"]
+                }
+            }
+        }
+
+        response = self.app.post('/api/receive-table-data', data=json.dumps(data), content_type='application/json')
+        result = json.loads(response.data.decode('utf-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(result['status'], 'error')
+        self.assertIn("Verify the columns and data types of the table 'jobs'.", result['message'])
+
+    def test_receive_table_data_with_non_list_column(self):
+        data = {
+            "table": {
+                "jobs": {
+                    "id": 5,
+                    "job": ["Manager"]
+                }
+            }
+        }
+
+        response = self.app.post('/api/receive-table-data', data=json.dumps(data), content_type='application/json')
+        result = json.loads(response.data.decode('utf-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(result['status'], 'error')
+        self.assertIn("Verify the columns and data types of the table 'jobs'.", result['message'])
+
+    def test_receive_table_data_with_null_in_non_nullable_column(self):
+        data = {
+            "table": {
+                "departments": {
+                    "id": [1, 2],
+                    "department": ["HR", None]
+                }
+            }
+        }
+
+        response = self.app.post('/api/receive-table-data', data=json.dumps(data), content_type='application/json')
+        result = json.loads(response.data.decode('utf-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(result['status'], 'error')
+        self.assertIn("Verify the columns and data types of the table 'departments'.", result['message'])
+
+    def test_receive_table_data_with_out_of_range_integer(self):
+        data = {
+            "table": {
+                "jobs": {
+                    "id": [2 ** 63, 102],
+                    "job": ["Manager", "Developer"]
+                }
+            }
+        }
+
+        response = self.app.post('/api/receive-table-data', data=json.dumps(data), content_type='application/json')
+        result = json.loads(response.data.decode('utf-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(result['status'], 'error')
+        self.assertIn("Verify the columns and data types of the table 'jobs'.", result['message'])
+
+    def test_receive_table_data_too_large_body(self):
+        data = {
+            "table": {
+                "jobs": {
+                    "id": [101],
+                    "job": ["Manager" * 200000]
+                }
+            }
+        }
+
+        response = self.app.post('/api/receive-table-data', data=json.dumps(data), content_type='application/json')
+        result = json.loads(response.data.decode('utf-8'))
+
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(result['status'], 'error')
+        self.assertIn("The request body must not exceed 1048576 bytes.", result['message'])
+
     def test_receive_table_data_with_different_data_types(self):
         data = {
             "table": {
@@ -265,5 +374,65 @@ class TestFlaskAPI(unittest.TestCase):
         self.assertIn("Verify the columns and data types of the table", result['message'])
 
 
+class TestSnowflakeWrite(unittest.TestCase):
+    def setUp(self):
+        self.app = app.test_client()
+        # Mock Snowflake connection and cursor
+        self.conn = mock.MagicMock()
+        self.conn.is_closed.return_value = False
+        self.cursor = self.conn.cursor.return_value
+        # Empty connection pool and dummy credentials for each test
+        credentials = dict.fromkeys(("user_login", "password", "account", "warehouse", "database", "schema"), "test")
+        patches = [
+            mock.patch("snowflake.connector.connect", return_value=self.conn),
+            mock.patch.object(api, "snowflake_connection_pool", queue.LifoQueue(maxsize=8)),
+            mock.patch.object(api, "snowflake_credentials", credentials),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.data = {
+            "table": {
+                "jobs": {
+                    "id": [1, 2],
+                    "job": ["Engineer", "Manager"]
+                }
+            }
+        }
+
+    def test_receive_table_data_merges_records(self):
+        response = self.app.post('/api/receive-table-data', data=json.dumps(self.data), content_type='application/json')
+        result = json.loads(response.data.decode('utf-8'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(result['status'], 'success')
+        statements = [call.args[0] for call in self.cursor.execute.call_args_list]
+        self.assertEqual(len(statements), 4)
+        self.assertEqual(statements[0], "CREATE OR REPLACE TEMPORARY TABLE TMP_JOBS LIKE JOBS")
+        self.assertTrue(statements[1].startswith("PUT file://TMP_JOBS.parquet @%TMP_JOBS"))
+        self.assertIn("file_stream", self.cursor.execute.call_args_list[1].kwargs)
+        self.assertTrue(statements[2].startswith("COPY INTO TMP_JOBS FROM @%TMP_JOBS"))
+        self.assertTrue(statements[3].startswith("MERGE INTO JOBS AS target USING TMP_JOBS AS source"))
+        self.assertIn("UPDATE SET target.JOB = source.JOB", statements[3])
+        self.assertIn("INSERT (ID, JOB) VALUES (source.ID, source.JOB)", statements[3])
+        self.conn.commit.assert_called_once()
+        # The connection is returned to the pool
+        self.conn.close.assert_not_called()
+        self.assertIs(api.snowflake_connection_pool.get_nowait(), self.conn)
+
+    def test_receive_table_data_discards_failed_connection(self):
+        self.cursor.execute.side_effect = Exception("Snowflake error")
+
+        response = self.app.post('/api/receive-table-data', data=json.dumps(self.data), content_type='application/json')
+        result = json.loads(response.data.decode('utf-8'))
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(result['status'], 'error')
+        self.assertIn("Error inserting data into  table 'JOBS'.", result['message'])
+        # The connection is closed instead of being returned to the pool
+        self.conn.close.assert_called_once()
+        self.assertTrue(api.snowflake_connection_pool.empty())
+
+
 if __name__ == '__main__':
     unittest.main()